@@ -9,14 +9,14 @@ Entry point only. Responsible for:
 """
 
 import pathlib
-from datetime import datetime
+import time
 
 import streamlit as st
 
-from config import load_config, col_name
+from config import load_config, col_name, variable_keys, group_keys
 from sheets import get_sheet_logger
 from utility import format_counter
-from tab_log import render_log_tab,_load_last_values,_handle_log_run,_reset_fields
+from tab_log import render_log_tab,_load_last_values,_reset_fields,_next_counters
 from tab_plot import render_plot_tab
 from tab_DoE import render_doe_tab
 from tab_calc import render_calc_tab
@@ -40,47 +40,50 @@ logger = get_sheet_logger()
 
 # ── Flush pending widget values ───────────────────────────────────────────────
 
-for group in groups:
-    for var in group["variables"]:
-        val_key    = f"{group['name']}_{var['name']}"
-        widget_key = f"input_{val_key}"
-        pending    = f"_pending_{widget_key}"
-        if pending in st.session_state:
-            st.session_state[widget_key] = st.session_state.pop(pending)
+for _, _, _, widget_key, pending in variable_keys():
+    if pending in st.session_state:
+        st.session_state[widget_key] = st.session_state.pop(pending)
 
 # ── Session state init ────────────────────────────────────────────────────────
 
-for group in groups:
-    for var in group["variables"]:
-        key = f"{group['name']}_{var['name']}"
-        if key not in st.session_state:
-            if var.get("type") == "auto_increment":
-                c = col_name(group["name"], var["name"])
-                last = logger.get_last_counter(c, var)
-                next_n = last + 1
-                formatted = format_counter(next_n, var)
-                st.session_state[key] = formatted
-                st.session_state[f"_counter_{key}"] = next_n
-                st.session_state[f"input_{key}"] = formatted
-            else:
-                default = var.get("default", "")
-                st.session_state[key] = default
-                st.session_state[f"input_{key}"] = default
-
-if "log_message" not in st.session_state:
-    st.session_state.log_message = None
-
-if "df_cache" not in st.session_state:
-    st.session_state.df_cache = None
+# Only needed on a session's first run; later reruns skip the key checks
+if not st.session_state.get("_init_done"):
+    missing = [entry for entry in variable_keys() if entry[2] not in st.session_state]
+    # Look every counter up together: one sheet read however many there are,
+    # skipping values already taken by queued runs and writes still in flight
+    counters = [
+        (col_name(group_name, var["name"]), var)
+        for group_name, var, _, _, _ in missing
+        if var.get("type") == "auto_increment"
+    ]
+    next_counters = iter(_next_counters(counters, logger))
+
+    for group_name, var, key, widget_key, _ in missing:
+        if var.get("type") == "auto_increment":
+            next_n = next(next_counters)
+            formatted = format_counter(next_n, var)
+            st.session_state[key] = formatted
+            st.session_state[f"_counter_{key}"] = next_n
+            st.session_state[widget_key] = formatted
+        else:
+            default = var.get("default", "")
+            st.session_state[key] = default
+            st.session_state[widget_key] = default
+
+    if "log_message" not in st.session_state:
+        st.session_state.log_message = None
+
+    if "df_cache" not in st.session_state:
+        st.session_state.df_cache = None
+
+    st.session_state["_init_done"] = True
 
 # ── active_groups ─────────────────────────────────────────────────────────────
-active_groups = [
-    g for g in groups
-    if g.get("always_on") or st.session_state.get(
-        f"toggle_{g['name']}",
-        st.session_state.get(f"active_{g['name']}", True),
-    )
-]
+_active_names = {
+    name for name, toggle_key, active_key in group_keys()
+    if st.session_state.get(toggle_key, st.session_state.get(active_key, True))
+}
+active_groups = [g for g in groups if g.get("always_on") or g["name"] in _active_names]
 
 # ── Sidebar ───────────────────────────────────────────────────────────────────
 
@@ -99,10 +102,6 @@ with st.sidebar:
         _load_last_values(groups, logger)
         st.rerun()
 
-    if st.button("📋 Log Run", type="primary", use_container_width=True):
-        _handle_log_run(active_groups, logger)
-        st.rerun()
-
     if st.button("🔄 Reset Fields", use_container_width=True):
         _reset_fields(groups, logger)
         st.rerun()
@@ -131,20 +130,21 @@ with st.sidebar:
     st.subheader("Log Details")
 
     n_rows = logger.row_count()
-    if n_rows:
+    if n_rows is None:
+        st.info("Could not connect to sheet.")
+    elif n_rows:
         st.metric("Total Runs Logged", n_rows)
         if st.button("📥 Fetch & Download CSV", width="stretch"):
             with st.spinner("Fetching data..."):
-                df_log = logger.load()
-            csv_bytes = df_log.to_csv(index=False).encode()
+                csv_bytes = logger.export_csv()
             st.download_button(
                 label="⬇️ Click to save",
                 data=csv_bytes,
-                file_name=f"experiment_log_{datetime.now().strftime('%Y%m%d')}.csv",
+                file_name=f"experiment_log_{time.strftime('%Y%m%d')}.csv",
                 mime="text/csv",
             )
     else:
-        st.info("Could not connect to sheet.")
+        st.info("Nothing logged yet.")
 
 # ── Tabs ──────────────────────────────────────────────────────────────────────
 
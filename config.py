@@ -2,19 +2,125 @@
 config.py — Load and query the YAML configuration.
 """
 
+import contextlib
+import os
 import pathlib
+import pickle
+
 import yaml
 import streamlit as st
 
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml C extension
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 _HERE = pathlib.Path(__file__).parent
 CONFIG_FILE = _HERE / "config.yaml"
+CONFIG_CACHE = CONFIG_FILE.with_suffix(".yaml.pkl")
 
 
 @st.cache_data
 def load_config() -> dict:
-    """Load config.yaml once and cache it for the session."""
-    with open(CONFIG_FILE, "r") as f:
-        return yaml.safe_load(f)
+    """
+    Load config.yaml once and cache it for the session.
+
+    A pickled copy is kept next to the YAML so a fresh server process can skip
+    the parse. It records the (mtime_ns, size) of the config.yaml it was built
+    from and is only used while both still match exactly, so a deploy that
+    preserves an older mtime (rsync -a, cp -p, tar) still invalidates it.
+    """
+    yaml_stat = CONFIG_FILE.stat()
+    stamp = (yaml_stat.st_mtime_ns, yaml_stat.st_size)
+    try:
+        cached_stamp, config = pickle.loads(CONFIG_CACHE.read_bytes())
+        if cached_stamp == stamp:
+            return config
+    except Exception:
+        pass  # Missing, truncated or otherwise unreadable — treat as a cache miss
+
+    # libyaml takes bytes directly, skipping Python's text decoding layer
+    config = yaml.load(CONFIG_FILE.read_bytes(), Loader=_YamlLoader)
+    # Write a private temp file and swap it in, so a crash or full disk never
+    # leaves a half-written pickle behind
+    tmp = CONFIG_CACHE.with_name(f"{CONFIG_CACHE.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(pickle.dumps((stamp, config)))
+        os.replace(tmp, CONFIG_CACHE)
+    except OSError:
+        # Read-only deployment or full disk — just parse on every cold start
+        with contextlib.suppress(OSError):
+            tmp.unlink(missing_ok=True)
+    return config
+
+
+@st.cache_resource
+def variable_keys() -> tuple[tuple[str, dict, str, str, str], ...]:
+    """
+    Return (group name, variable, value key, widget key, pending key) for every
+    configured variable. Built once per process rather than on every rerun.
+    """
+    plan = []
+    for group in load_config()["groups"]:
+        for var in group["variables"]:
+            key = f"{group['name']}_{var['name']}"
+            plan.append((group["name"], var, key, f"input_{key}", f"_pending_input_{key}"))
+    return tuple(plan)
+
+
+@st.cache_resource
+def render_plan() -> dict[str, tuple[tuple, ...]]:
+    """
+    Return, per group name, one (type, value key, widget key, label, help,
+    options, variable) tuple per variable, so the input cards can be rendered
+    by tuple unpacking rather than dict lookups on every rerun.
+    """
+    return {
+        group["name"]: tuple(
+            (
+                var.get("type", "text"),
+                f"{group['name']}_{var['name']}",
+                f"input_{group['name']}_{var['name']}",
+                f"{var['name']} *" if var.get("required") else var["name"],
+                var.get("help", ""),
+                tuple(var.get("options", [])),
+                var,
+            )
+            for var in group["variables"]
+        )
+        for group in load_config()["groups"]
+    }
+
+
+@st.cache_resource
+def row_template() -> dict[str, tuple[tuple[str, str], ...]]:
+    """Return, per group name, the (value key, sheet column name) pair of each variable."""
+    return {
+        group["name"]: tuple(
+            (f"{group['name']}_{var['name']}", col_name(group["name"], var["name"]))
+            for var in group["variables"]
+        )
+        for group in load_config()["groups"]
+    }
+
+
+@st.cache_resource
+def required_keys() -> tuple[tuple[str, str, str], ...]:
+    """Return (group name, value key, variable name) for every required variable."""
+    return tuple(
+        (group_name, key, var["name"])
+        for group_name, var, key, _, _ in variable_keys()
+        if var.get("required")
+    )
+
+
+@st.cache_resource
+def group_keys() -> tuple[tuple[str, str, str], ...]:
+    """Return (group name, toggle key, active key) for every configured group."""
+    return tuple(
+        (group["name"], f"toggle_{group['name']}", f"active_{group['name']}")
+        for group in load_config()["groups"]
+    )
 
 
 def get_filterable_col_names(groups: list) -> list[str]:
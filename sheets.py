@@ -2,10 +2,23 @@
 sheets.py — Google Sheets access layer.
 """
 
+import csv
+import io
+import json
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
 import gspread
+from gspread.utils import rowcol_to_a1
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from utility import extract_counter
 
@@ -13,6 +26,12 @@ SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
+LOG_TTL = 300  # seconds before load() re-fetches the full sheet
+
+_HERE = pathlib.Path(__file__).parent
+PENDING_FILE = _HERE / "pending.jsonl"  # rows accepted but not yet confirmed in the sheet
+REJECTED_FILE = _HERE / "pending.rejected"  # damaged PENDING_FILE lines, kept for inspection
+_QUEUED = "queued"  # PENDING_FILE marker for rows held until the queue is saved
 
 
 class SheetLogger:
@@ -26,81 +45,494 @@ class SheetLogger:
             raise RuntimeError("Missing google_sheets in Streamlit secrets")
         creds_dict = dict(st.secrets["gcp_service_account"])
         creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-        client = gspread.authorize(creds)
+        client = gspread.authorize(creds, session=_build_session(creds))
         sheet_id = st.secrets["google_sheets"]["sheet_id"]
         spreadsheet = client.open_by_key(sheet_id)
         try:
             self.ws = spreadsheet.worksheet("Log")
         except gspread.WorksheetNotFound:
             self.ws = spreadsheet.add_worksheet(title="Log", rows=2000, cols=50)
+        self._headers: list[str] | None = None
+
+        # Local copy of the sheet's values, kept in step with our own writes
+        self._lock = threading.Lock()
+        self._log_values: list[list[str]] | None = None
+        self._log_df: pd.DataFrame | None = None
+        self._log_fetched_at = 0.0
+        self._log_version = 0  # bumped on every write, so a fetch that raced one is not kept
+
+        self._pending_lock = threading.Lock()
+        if self.pending_rows():
+            # Rows left over from a previous process that never reached the sheet
+            _get_writer().submit(self._flush_pending)
 
     def load(self) -> pd.DataFrame:
-        """Fetch all logged rows as a DataFrame. Returns empty DF on failure."""
+        """
+        Return all logged rows as a DataFrame. Returns empty DF on failure.
+
+        The full sheet is only fetched on first use, after LOG_TTL, or after
+        clear_cache(); rows written through this logger are appended locally.
+        The returned frame is shared, so treat it as read-only.
+        """
         try:
-            data = self.ws.get_all_records()
-            if not data:
-                return pd.DataFrame()
-            df = pd.DataFrame(data)
-            for col in df.columns:
-                converted = pd.to_numeric(df[col], errors="coerce")
-                if converted.notna().sum() > 0:
-                    df[col] = converted
-            return df
+            values = self._load_values()
+            with self._lock:
+                if values is self._log_values:
+                    if self._log_df is None:
+                        self._log_df = _values_to_frame(values)
+                    return self._log_df
+            return _values_to_frame(values)
         except Exception as e:
             st.warning(f"Could not load log from Google Sheets: {e}")
             return pd.DataFrame()
 
-    def row_count(self) -> int:
-        """Return the number of data rows (excluding the header)."""
+    def load_recent(self, n: int = 20) -> pd.DataFrame:
+        """
+        Fetch only the last n logged rows, newest first.
+        Returns empty DF if nothing is logged or on failure.
+
+        Slices the local copy of the sheet when load() has one; otherwise
+        only those n rows are requested from the sheet.
+        """
+        values = self._snapshot()
+        if values:
+            tail = values[max(1, len(values) - n):]
+            return _values_to_frame([values[0]] + tail[::-1])
+        try:
+            last = _fetch_row_count(self.ws)
+            if last < 2:
+                return pd.DataFrame()
+            return _fetch_recent(self.ws, tuple(self._get_headers()), last, n)
+        except Exception as e:
+            st.warning(f"Could not load recent runs from Google Sheets: {e}")
+            return pd.DataFrame()
+
+    def export_csv(self) -> bytes:
+        """
+        Return the whole log encoded as CSV, written straight from the sheet's
+        values so cells come out exactly as stored. Returns empty bytes on failure.
+
+        Always reads the sheet afresh (and refreshes the local copy with it):
+        the local copy can lag other writers and holds rows as sent, not as
+        the sheet parsed them.
+        """
+        try:
+            values = self._load_values(fresh=True)
+            with self._lock:
+                values = list(values)  # the writer may append to the shared list meanwhile
+            if len(values) < 2:
+                return b""
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator="\n").writerows(values)
+            return buf.getvalue().encode("utf-8")
+        except Exception as e:
+            st.warning(f"Could not export log from Google Sheets: {e}")
+            return b""
+
+    def clear_cache(self) -> None:
+        """Drop cached reads so the next call pulls fresh data from the sheet."""
+        with self._lock:
+            self._log_values = None
+            self._log_df = None
+        _fetch_row_count.clear()
+        _fetch_recent.clear()
+        _fetch_columns.clear()
+
+    def row_count(self) -> int | None:
+        """
+        Return the number of data rows (excluding the header), from the local
+        copy of the sheet if loaded, else a cached single-column read.
+        Returns None if the sheet cannot be reached.
+        """
+        values = self._snapshot()
+        if values is not None:
+            return max(0, len(values) - 1)
         try:
-            all_vals = self.ws.get_all_values()
-            return max(0, len(all_vals) - 1)
+            return max(0, _fetch_row_count(self.ws) - 1)
         except Exception:
-            return 0
+            return None
 
     def get_last_counter(self, col_name: str, var: dict) -> int:
         """
         Scan the sheet column and return the highest counter value found.
         Falls back to (start - 1) if the column is empty or missing.
         """
-        start = int(var.get("start", 1))
+        return self.get_last_counters([(col_name, var)])[0]
+
+    def get_last_counters(self, counters: list[tuple[str, dict]], fresh: bool = False) -> list[int]:
+        """
+        get_last_counter for several (column name, variable) pairs at once.
+
+        Reads the local copy of the sheet if loaded. Otherwise only the counter
+        columns are fetched, together in one cached batch_get, using the cached
+        header row to find them. fresh=True skips every cache and reads the
+        sheet itself, so runs added by other sessions or by hand are seen.
+        """
+        fallback = [int(var.get("start", 1)) - 1 for _, var in counters]
         try:
-            all_values = self.ws.get_all_values()
-            if not all_values or len(all_values) < 2:
-                return start - 1
-            headers = all_values[0]
-            if col_name not in headers:
-                return start - 1
-            col_idx = headers.index(col_name)
-            nums = [
-                n for row in all_values[1:]
-                if col_idx < len(row) and row[col_idx]
-                for n in [extract_counter(row[col_idx], var)]
-                if n is not None
-            ]
-            return max(nums) if nums else start - 1
+            if fresh:
+                values = None
+                headers = self._get_headers(refresh=True)
+                _fetch_columns.clear()
+            else:
+                values = self._snapshot()
+                headers = values[0] if values else self._get_headers()
+            idxs = [headers.index(c) if c in headers else None for c, _ in counters]
+            wanted = tuple(sorted({i for i in idxs if i is not None}))
+            if values:
+                columns = {i: [row[i] if i < len(row) else "" for row in values[1:]] for i in wanted}
+            else:
+                columns = dict(zip(wanted, _fetch_columns(self.ws, wanted)))
+
+            results = []
+            for (_, var), idx, last in zip(counters, idxs, fallback):
+                nums = [
+                    n for value in columns.get(idx, [])
+                    if value
+                    for n in [extract_counter(value, var)]
+                    if n is not None
+                ]
+                results.append(max(nums) if nums else last)
+            return results
         except Exception:
-            return start - 1
+            return fallback
 
     def append(self, row: dict) -> None:
+        """Append a single row dict to the sheet. See append_rows."""
+        self.append_rows([row])
+
+    def append_rows(self, rows: list[dict]) -> None:
         """
-        Append a row dict to the sheet.
+        Append several row dicts to the sheet in one API call.
 
-        Automatically extends the header row if the dict contains new keys
+        Automatically extends the header row if the dicts contain new keys
         (e.g. when a new equipment group is activated for the first time).
+        The header row is re-read first, as columns may have been inserted or
+        moved in the sheet by hand; writes run on the background writer, so
+        that read adds no UI latency.
         """
-        existing = self.ws.get_all_values()
-        if not existing:
-            # Sheet is brand new — write header first
-            self.ws.append_row(list(row.keys()), value_input_option="USER_ENTERED")
+        if not rows:
+            return
+        keys = list(dict.fromkeys(k for row in rows for k in row))
+        headers = self._get_headers(refresh=True)
+
+        if not headers:
+            # Sheet is brand new — write header first, in the same call
+            headers = keys
+            data = [[row.get(h, "") for h in headers] for row in rows]
+            self.ws.append_rows([headers] + data, value_input_option="USER_ENTERED")
         else:
-            current_headers = existing[0]
-            new_headers = [k for k in row.keys() if k not in current_headers]
+            new_headers = [k for k in keys if k not in headers]
             if new_headers:
-                self.ws.update("1:1", [current_headers + new_headers])
-            current_headers = self.ws.row_values(1)
-            row = {k: row.get(k, "") for k in current_headers}
-        self.ws.append_row(list(row.values()), value_input_option="USER_ENTERED")
+                headers = headers + new_headers
+                # Kept apart from the append below on purpose: a single batchUpdate would
+                # have to name the target row, and any row count held here can be stale,
+                # so rows added elsewhere would be overwritten. values.append picks the
+                # row server-side.
+                self.ws.update([headers], "1:1")
+            data = [[row.get(h, "") for h in headers] for row in rows]
+            self.ws.append_rows(data, value_input_option="USER_ENTERED")
+
+        self._headers = headers
+        self._record_written(headers, data)
+
+    def _record_written(self, headers: list[str], data: list[list]) -> None:
+        """
+        Mirror freshly written rows into the local copy of the sheet, so the
+        next load() does not need to re-download everything.
+        """
+        with self._lock:
+            self._log_version += 1
+            # get_all_values pads the header row with blanks; row_values(1) does not
+            known = list(self._log_values[0]) if self._log_values else []
+            while known and not known[-1]:
+                known.pop()
+            if headers[:len(known)] != known:
+                # Columns were moved in the sheet itself, so the local rows no longer line up
+                self._log_values = None
+                self._log_df = None
+            if self._log_values is not None:
+                if self._log_values:
+                    self._log_values[0] = list(headers)
+                else:
+                    self._log_values.append(list(headers))
+                self._log_values.extend(
+                    ["" if v is None else str(v) for v in row] for row in data
+                )
+                self._log_df = None
+        _fetch_row_count.clear()
+        _fetch_recent.clear()
+        _fetch_columns.clear()
+
+    def append_rows_async(self, rows: list[dict]) -> Future:
+        """
+        Record rows in PENDING_FILE, then write everything pending to the sheet
+        on the background writer and return its Future, so the UI does not
+        block on the Sheets round-trip. Rows stay in the file until the sheet
+        write succeeds, so a failed write is retried by the next one.
+        """
+        lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        try:
+            with self._pending_lock, PENDING_FILE.open("a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            # Read-only deployment or full disk — write straight to the sheet instead
+            return _get_writer().submit(self.append_rows, rows)
+        return _get_writer().submit(self._flush_pending)
+
+    def queue_rows(self, rows: list[dict]) -> Future | None:
+        """
+        Hold rows in PENDING_FILE, marked as queued, until save_queued() is called.
+        Queued rows outlive the session that queued them and are visible to all.
+
+        Returns None once they are held. If PENDING_FILE cannot be written, the
+        rows are written straight to the sheet instead and that Future returned.
+        """
+        lines = "".join(json.dumps([_QUEUED, row], default=str) + "\n" for row in rows)
+        try:
+            with self._pending_lock, PENDING_FILE.open("a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            return _get_writer().submit(self.append_rows, rows)
+        return None
+
+    def save_queued(self, rows: list[dict] = ()) -> Future:
+        """
+        Mark every queued row as pending, record any further rows after them,
+        and write the lot to the sheet in one background call. See append_rows_async.
+        """
+        try:
+            with self._pending_lock:
+                lines = self._read_pending()
+                entries = [_parse_pending(line) for line in lines]
+                # Rewrite in place so the file keeps its order and line positions
+                self._write_pending([
+                    json.dumps(entry[1], default=str) if entry and entry[0] else line
+                    for line, entry in zip(lines, entries)
+                ] + [json.dumps(row, default=str) for row in rows])
+        except OSError:
+            return _get_writer().submit(self.append_rows, list(rows))
+        return _get_writer().submit(self._flush_pending)
+
+    def queued_rows(self) -> list[dict]:
+        """Return rows held by queue_rows() that have not been saved yet."""
+        with self._pending_lock:
+            lines = self._read_pending()
+        return [entry[1] for entry in map(_parse_pending, lines) if entry and entry[0]]
+
+    def pending_rows(self) -> list[dict]:
+        """Return rows recorded in PENDING_FILE to be written, but not yet in the sheet."""
+        with self._pending_lock:
+            lines = self._read_pending()
+        return [entry[1] for entry in map(_parse_pending, lines) if entry and not entry[0]]
+
+    def _flush_pending(self) -> None:
+        """
+        Write every pending row in PENDING_FILE to the sheet, then drop them
+        from the file. Queued rows are left in place.
+        """
+        with self._pending_lock:
+            lines = self._read_pending()
+        entries = [_parse_pending(line) for line in lines]
+        rows = [entry[1] for entry in entries if entry and not entry[0]]
+        rejected = [line for line, entry in zip(lines, entries) if entry is None]
+        if not (rows or rejected):
+            return
+        self.append_rows(rows)
+        with self._pending_lock:
+            if rejected:
+                # Set damaged lines (e.g. cut short by a crash) aside rather than retry them forever
+                try:
+                    with REJECTED_FILE.open("a", encoding="utf-8") as f:
+                        f.write("".join(line + "\n" for line in rejected))
+                except OSError:
+                    pass  # Still drop them below, or the rows just written would be resent
+            # Only this writer removes lines, so the first len(lines) still match
+            # ours, though save_queued() may since have turned queued ones pending
+            current = self._read_pending()
+            kept = [
+                line for line, entry in zip(current, entries)
+                if entry is not None and entry[0]
+            ]
+            self._write_pending(kept + current[len(lines):])
+
+    @staticmethod
+    def _read_pending() -> list[str]:
+        """Return the non-empty lines of PENDING_FILE. Callers hold _pending_lock."""
+        try:
+            text = PENDING_FILE.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return []
+        return [line for line in text.splitlines() if line.strip()]
+
+    @staticmethod
+    def _write_pending(lines: list[str]) -> None:
+        """Replace PENDING_FILE with lines in one step. Callers hold _pending_lock."""
+        tmp = PENDING_FILE.with_suffix(".tmp")
+        tmp.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+        os.replace(tmp, PENDING_FILE)
+
+    def _load_values(self, fresh: bool = False) -> list[list[str]]:
+        """
+        Return the local copy of the sheet values, fetching the full sheet on
+        first use, after LOG_TTL, or when fresh is set.
+
+        The fetch runs without holding self._lock, so other sessions and the
+        background writer are not held up by it. If a write lands meanwhile the
+        fetched values are returned but not kept, as they may predate it.
+        """
+        values = None if fresh else self._snapshot()
+        if values is not None:
+            return values
+        with self._lock:
+            version = self._log_version
+        values = self.ws.get_all_values()
+        with self._lock:
+            if self._log_version == version:
+                self._log_values = values
+                self._log_fetched_at = time.monotonic()
+                self._log_df = None
+                # The header row came with it, so writes need not re-read row 1
+                self._headers = list(values[0]) if values else []
+        return values
+
+    def _snapshot(self) -> list[list[str]] | None:
+        """Return the local copy of the sheet values if loaded and within LOG_TTL."""
+        with self._lock:
+            if self._log_values is not None and time.monotonic() - self._log_fetched_at <= LOG_TTL:
+                return self._log_values
+        return None
+
+    def _get_headers(self, refresh: bool = False) -> list[str]:
+        """Return the header row, only fetching it from the sheet when not cached."""
+        if self._headers is None or refresh:
+            self._headers = self.ws.row_values(1)
+        return self._headers
+
+
+def _parse_pending(line: str) -> tuple[bool, dict] | None:
+    """
+    Decode one PENDING_FILE line into (queued, row). A plain row is pending;
+    [_QUEUED, row] is held for save_queued(). Returns None if it is damaged.
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(entry, dict):
+        return False, entry
+    if isinstance(entry, list) and len(entry) == 2 and entry[0] == _QUEUED and isinstance(entry[1], dict):
+        return True, entry[1]
+    return None
+
+
+def _build_session(creds: Credentials) -> AuthorizedSession:
+    """
+    Return an authorised HTTP session that keeps connections to the Sheets API
+    alive between calls and backs off automatically when rate limited.
+
+    Only failed connections and 429/503 responses are retried: in each case
+    the request was not processed, so even a non-idempotent append cannot be
+    written twice. Read errors (timeouts, resets after sending) are not
+    retried, as the request may already have been applied.
+    """
+    retry = Retry(
+        total=5,
+        read=False,
+        backoff_factor=0.3,
+        status_forcelist=(429, 503),
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    session = AuthorizedSession(creds)
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry))
+    return session
+
+
+@st.cache_resource
+def _get_writer() -> ThreadPoolExecutor:
+    """
+    Return the process-wide background writer.
+    A single worker keeps writes in submission order and the header cache consistent.
+    """
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheet-writer")
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_row_count(_ws: gspread.Worksheet) -> int:
+    """
+    Return the number of populated cells in column A (header included).
+
+    Only the Timestamp column is fetched, and the result is cached so the
+    sidebar metric does not hit the API on every rerun. Cleared after writes.
+    """
+    return len(_ws.col_values(1))
+
+
+def _values_to_frame(values: list[list[str]]) -> pd.DataFrame:
+    """Build the typed log DataFrame from raw sheet values (header row first)."""
+    if len(values) < 2:
+        return pd.DataFrame()
+    headers = values[0]
+    width = len(headers)
+    # Rows written before the header grew are shorter, so pad them out
+    rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in values[1:]]
+    # Build straight from the 2D list; get_all_records would allocate a dict per row
+    return _coerce_numeric(pd.DataFrame(rows, columns=_unique_headers(headers)))
+
+
+def _unique_headers(headers: list[str]) -> list[str]:
+    """
+    Name blank header cells 'Unnamed: i' and suffix repeats with '.1', '.2', …
+    (as pandas.read_csv does), so every DataFrame column label is unique.
+    """
+    names = [header or f"Unnamed: {i}" for i, header in enumerate(headers)]
+    reserved = set(names)
+    used: set[str] = set()
+    unique: list[str] = []
+    for name in names:
+        if name in used:
+            # Skip suffixes already used or present elsewhere in the header
+            n = 1
+            while f"{name}.{n}" in used or f"{name}.{n}" in reserved:
+                n += 1
+            name = f"{name}.{n}"
+        used.add(name)
+        unique.append(name)
+    return unique
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_columns(_ws: gspread.Worksheet, col_idxs: tuple[int, ...]) -> list[list[str]]:
+    """Fetch the given 0-based columns (header excluded) in one batch_get, cached."""
+    if not col_idxs:
+        return []
+    letters = [rowcol_to_a1(1, i + 1)[:-1] for i in col_idxs]
+    ranges = _ws.batch_get([f"{c}2:{c}" for c in letters], major_dimension="COLUMNS")
+    return [r[0] if r else [] for r in ranges]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_recent(_ws: gspread.Worksheet, headers: tuple, last: int, n: int) -> pd.DataFrame:
+    """
+    Fetch rows max(2, last - n + 1)..last only, newest first.
+    Keyed on the last row number, so a new write naturally misses the cache.
+    """
+    first = max(2, last - n + 1)
+    rows = _ws.get(
+        f"A{first}:{rowcol_to_a1(last, len(headers))}", maintain_size=True
+    )
+    return _coerce_numeric(pd.DataFrame(list(reversed(rows)), columns=_unique_headers(list(headers))))
+
+
+def _coerce_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert every column with at least one numeric-looking value to numbers."""
+    if df.empty:
+        return df
+    numeric = df.apply(pd.to_numeric, errors="coerce")
+    cols = numeric.columns[numeric.notna().any().to_numpy()]
+    df[cols] = numeric[cols]
+    return df
 
 
 @st.cache_resource
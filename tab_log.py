@@ -5,26 +5,32 @@ Call render_log_tab(logger, groups) from app.py inside the tab_log
 context manager.
 """
 
-from datetime import datetime
+import time
 
 import streamlit as st
 
-from config import col_name
+from config import col_name, render_plan, required_keys, row_template
 from sheets import SheetLogger
-from utility import format_counter
+from utility import TIMESTAMP_FORMAT, format_counter, extract_counter
 
 ncol = 3
+BATCH_SIZE = 10  # queued runs are written automatically once this many are waiting
 
 def render_log_tab(logger: SheetLogger,active_groups:list, groups: list) -> None:
     st.title("Experiment Logger")
 
+    _collect_finished_writes()
     _flash_message()
 
     if not active_groups:
         st.warning("No equipment groups are active. Enable some in the sidebar.")
     else:
-        _render_input_cards(active_groups, logger)
-        _render_action_buttons(active_groups, groups, logger)
+        # A form holds back widget changes until a button is pressed, so editing
+        # a field no longer reruns the whole script. Enter must not submit: the
+        # first button is a counter re-sync, which would discard an overridden value
+        with st.form("run_entry", clear_on_submit=False, enter_to_submit=False, border=False):
+            _render_input_cards(active_groups, logger)
+            _render_action_buttons(active_groups, groups, logger)
 
     st.markdown("---")
     _render_recent_runs(logger)
@@ -40,16 +46,68 @@ def _flash_message() -> None:
         st.session_state.log_message = None
 
 
+def _collect_finished_writes() -> None:
+    """
+    Check background writes started on earlier reruns. Rows from a failed write
+    stay in the logger's pending file and are retried with the next write.
+    """
+    in_flight = st.session_state.get("_pending_writes", [])
+    if not in_flight:
+        return
+    still_running = []
+    for future in in_flight:
+        if not future.done():
+            still_running.append(future)
+        elif future.exception() is not None:
+            st.session_state.log_message = (
+                "error",
+                f"❌ Failed to write to Google Sheets: {future.exception()}. "
+                f"Unsaved runs are kept locally and will be retried with the next save.",
+            )
+    st.session_state["_pending_writes"] = still_running
+
+
+def _track_write(future) -> None:
+    """Remember a background write so _collect_finished_writes can report on it."""
+    st.session_state.setdefault("_pending_writes", []).append(future)
+
+
+def _unsaved_rows(logger: SheetLogger) -> list:
+    """Rows that are queued or still waiting to be written, i.e. not yet in the sheet."""
+    return logger.queued_rows() + logger.pending_rows()
+
+
+def _next_counters(counters: list, logger: SheetLogger, fresh: bool = False) -> list[int]:
+    """
+    Return the next free value of each (column name, variable) counter: one past
+    the highest in the sheet or in any run that is queued or still being written.
+    """
+    lasts = logger.get_last_counters(counters, fresh=fresh)
+    unsaved = _unsaved_rows(logger)
+    next_values = []
+    for (c, var), last in zip(counters, lasts):
+        # Unsaved runs are not in the sheet yet, but their counters are taken
+        queued = [
+            n for row in unsaved
+            if row.get(c)
+            for n in [extract_counter(str(row[c]), var)]
+            if n is not None
+        ]
+        next_values.append(max([last, *queued]) + 1)
+    return next_values
+
+
 def _render_input_cards(active_groups: list, logger: SheetLogger) -> None:
     """Render variable input cards in a ncol-column grid."""
+    plan = render_plan()
     for i in range(0, len(active_groups), ncol):
         cols = st.columns(ncol)
         for j, group in enumerate(active_groups[i : i + ncol]):
             with cols[j]:
                 with st.container(border=True):
                     st.subheader(group["name"])
-                    for var in group["variables"]:
-                        _render_variable_input(group, var, logger)
+                    for spec in plan[group["name"]]:
+                        _render_variable_input(group, spec, logger)
 
 def _load_last_values(groups: list, logger: SheetLogger) -> None:
     df = logger.load()
@@ -77,163 +135,242 @@ def _load_last_values(groups: list, logger: SheetLogger) -> None:
         st.session_state[f"_pending_input_{k}"] = v
 
 def _render_action_buttons(active_groups: list, groups: list, logger: SheetLogger) -> None:
-    """Render the Log Run and Reset Fields buttons and handle their actions."""
+    """Render the Log Run, Queue Run and Reset Fields buttons and handle their actions."""
     st.markdown("---")
-    col1, col2, col3 = st.columns([1,1,1])
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
 
     with col1:
-        if st.button("⏮️ Use Last Values", width="stretch"):
+        if st.form_submit_button("⏮️ Use Last Values", key="form_last_values", width="stretch"):
             _load_last_values(groups, logger)
             st.rerun()
 
     with col2:
-        if st.button("📋 Log Run", type="primary", width="stretch"):
+        if st.form_submit_button("📋 Log Run", key="form_log_run", type="primary", width="stretch"):
             _handle_log_run(active_groups, logger)
             st.rerun()
 
     with col3:
-        if st.button("🔄 Reset Fields", width="stretch"):
+        if st.form_submit_button("➕ Queue Run", key="form_queue_run", width="stretch",
+                                 help=f"Hold this run and save queued runs together "
+                                      f"(automatically once {BATCH_SIZE} are waiting)."):
+            _handle_queue_run(active_groups, logger)
+            st.rerun()
+
+    with col4:
+        if st.form_submit_button("🔄 Reset Fields", key="form_reset_fields", width="stretch"):
             _reset_fields(groups, logger)
             st.rerun()
 
+    n_pending = len(logger.queued_rows())
+    if n_pending:
+        if st.form_submit_button(f"💾 Save {n_pending} queued run{'s' if n_pending != 1 else ''}",
+                                 key="form_save_queued", width="stretch"):
+            _flush_pending_rows(logger)
+            st.rerun()
+
 
 
 def _render_recent_runs(logger: SheetLogger) -> None:
     """Render the recent runs expander at the bottom of the tab."""
     with st.expander("📊 View Recent Runs", expanded=False):
         with st.spinner("Loading..."):
-            df_log = logger.load()
-        if df_log.empty:
+            df_recent = logger.load_recent(20)
+        if df_recent.empty:
             st.info("Nothing logged yet.")
         else:
-            st.dataframe(df_log.tail(20).iloc[::-1], width="stretch", hide_index=True)
-            st.caption(f"Showing last 20 of {len(df_log)} total runs.")
+            st.dataframe(df_recent, width="stretch", hide_index=True)
+            st.caption(f"Showing last {len(df_recent)} of {logger.row_count()} total runs.")
 
 
-def _render_variable_input(group: dict, var: dict, logger: SheetLogger) -> None:
-    """Render the correct Streamlit widget for a single variable."""
-    val_key = f"{group['name']}_{var['name']}"
-    vtype = var.get("type", "text")
-    display_label = f"{var['name']} *" if var.get("required") else var["name"]
-    help_text=var.get("help","")
+def _render_variable_input(group: dict, spec: tuple, logger: SheetLogger) -> None:
+    """Render the correct Streamlit widget for a single render_plan() entry."""
+    vtype, val_key, widget_key, display_label, help_text, options, var = spec
 
     if vtype == "auto_increment":
         c1, c2 = st.columns([3, 1])
         with c1:
             override = st.text_input(
                 display_label,
-                key=f"input_{val_key}",
+                key=widget_key,
                 help=help_text or "Auto-increments on log. Edit manually to override.",
             )
             st.session_state[val_key] = override
         with c2:
             st.markdown("<br>", unsafe_allow_html=True)
-            if st.button("🔁", key=f"resync_{val_key}", help="Re-sync from sheet"):
+            if st.form_submit_button("🔁", key=f"resync_{val_key}", help="Re-sync from sheet"):
                 _resync_counter(group, var, val_key, logger)
                 st.rerun()
 
     elif vtype == "float":
         st.session_state[val_key] = st.number_input(
             display_label,
-            key=f"input_{val_key}",
+            key=widget_key,
             format="%.3f",
             help=help_text,
         )
     elif vtype == "integer":
         st.session_state[val_key] = st.number_input(
             display_label,
-            key=f"input_{val_key}",
+            key=widget_key,
             step=1,
             help=help_text,
         )
     elif vtype == "select":
-        options = var.get("options", [])
         st.session_state[val_key] = st.selectbox(
             display_label,
             options=options,
-            key=f"input_{val_key}",
+            key=widget_key,
             help=help_text,
         )
     else:
         st.session_state[val_key] = st.text_input(
             display_label,
-            key=f"input_{val_key}",
+            key=widget_key,
             help=help_text,
         )
 
 
 def _resync_counter(group: dict, var: dict, val_key: str, logger: SheetLogger) -> None:
     """Pull the latest counter value from the sheet and stage it for the next rerun."""
-    c = col_name(group["name"], var["name"])
-    last = logger.get_last_counter(c, var)
-    next_n = last + 1
-    formatted = format_counter(next_n, var)
-    st.session_state[val_key] = formatted
-    st.session_state[f"_counter_{val_key}"] = next_n
-    st.session_state[f"_pending_input_{val_key}"] = formatted
+    _resync_counters([(group, var, val_key)], logger)
+
+
+def _resync_counters(counters: list, logger: SheetLogger) -> None:
+    """
+    _resync_counter for several (group, variable, value key) entries, reading
+    the sheet directly (not the caches) in a single call.
+    """
+    next_values = _next_counters(
+        [(col_name(group["name"], var["name"]), var) for group, var, _ in counters],
+        logger, fresh=True,
+    )
+    for (_, var, val_key), next_n in zip(counters, next_values):
+        formatted = format_counter(next_n, var)
+        st.session_state[val_key] = formatted
+        st.session_state[f"_counter_{val_key}"] = next_n
+        st.session_state[f"_pending_input_{val_key}"] = formatted
 
 
 def _reset_fields(groups: list, logger: SheetLogger) -> None:
     """Reset all fields to defaults, re-syncing auto-increment counters from the sheet."""
+    counters = []
     for group in groups:
         for var in group["variables"]:
             key = f"{group['name']}_{var['name']}"
             if var.get("type") == "auto_increment":
-                _resync_counter(group, var, key, logger)
+                counters.append((group, var, key))
             else:
                 st.session_state[key] = var.get("default", "")
+    if counters:
+        _resync_counters(counters, logger)
 
 
 def _handle_log_run(active_groups: list, logger: SheetLogger) -> None:
-    """Validate required fields, write the row, then advance auto-increment counters."""
-    missing = [
-        var["name"]
-        for group in active_groups
-        for var in group["variables"]
-        if var.get("required")
-        and not str(st.session_state[f"{group['name']}_{var['name']}"]).strip()
-    ]
+    """
+    Validate required fields, start writing the row (plus any queued runs) in the
+    background, then advance counters. Failures surface on a later rerun.
+    """
+    row = _build_row(active_groups)
+    if row is None:
+        st.rerun()
+        return
 
-    if missing:
-        st.session_state.log_message = (
-            "error",
-            f"Please fill in required fields: {', '.join(missing)}",
-        )
+    n_queued = len(logger.queued_rows())
+    _track_write(logger.save_queued([row]))
+    _advance_counters(active_groups)
+
+    run_id = row.get(col_name("General", "Run ID"), "—")
+    queued_note = f" along with {n_queued} queued run{'s' if n_queued != 1 else ''}" if n_queued else ""
+    st.session_state.log_message = (
+        "success",
+        f"✅ Run '{run_id}' logged at {row['Timestamp']}{queued_note}",
+    )
+
+    st.rerun()
+
+
+def _handle_queue_run(active_groups: list, logger: SheetLogger) -> None:
+    """
+    Validate required fields and hold the row in the logger's queue, then advance
+    counters. The queue outlives the session and is written in one call once it
+    reaches BATCH_SIZE rows.
+    """
+    row = _build_row(active_groups)
+    if row is None:
         st.rerun()
         return
 
-    row = {"Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-    for group in active_groups:
-        for var in group["variables"]:
-            row[col_name(group["name"], var["name"])] = (
-                st.session_state[f"{group['name']}_{var['name']}"]
-            )
+    future = logger.queue_rows([row])
+    _advance_counters(active_groups)
+    run_id = row.get(col_name("General", "Run ID"), "—")
 
-    try:
-        with st.spinner("Saving to Google Sheets..."):
-            logger.append(row)
-
-        for group in active_groups:
-            for var in group["variables"]:
-                if var.get("type") == "auto_increment":
-                    key = f"{group['name']}_{var['name']}"
-                    counter_key = f"_counter_{key}"
-                    current_n = st.session_state.get(counter_key, int(var.get("start", 1)))
-                    next_n = current_n + 1
-                    formatted = format_counter(next_n, var)
-                    st.session_state[key] = formatted
-                    st.session_state[counter_key] = next_n
-                    st.session_state[f"_pending_input_{key}"] = formatted
-
-        run_id = row.get(col_name("General", "Run ID"), "—")
+    if future is not None:
+        # The queue could not be stored, so the run went straight to the sheet
+        _track_write(future)
+        st.session_state.log_message = ("success", f"✅ Run '{run_id}' logged at {row['Timestamp']}")
+        st.rerun()
+        return
+
+    n_pending = len(logger.queued_rows())
+    if n_pending >= BATCH_SIZE:
+        _flush_pending_rows(logger)
+    else:
         st.session_state.log_message = (
             "success",
-            f"✅ Run '{run_id}' logged at {row['Timestamp']}",
+            f"➕ Run '{run_id}' queued ({n_pending} waiting to be saved)",
         )
-    except Exception as e:
+    st.rerun()
+
+
+def _flush_pending_rows(logger: SheetLogger) -> None:
+    """Write every queued row to the sheet in a single background API call."""
+    n = len(logger.queued_rows())
+    if not n:
+        return
+    _track_write(logger.save_queued())
+    st.session_state.log_message = (
+        "success",
+        f"✅ {n} queued run{'s' if n != 1 else ''} sent to Google Sheets",
+    )
+
+
+def _build_row(active_groups: list) -> dict | None:
+    """
+    Assemble the row dict for the current inputs.
+    Returns None (and sets an error message) if required fields are missing.
+    """
+    active_names = {group["name"] for group in active_groups}
+    missing = [
+        var_name
+        for group_name, key, var_name in required_keys()
+        if group_name in active_names and not str(st.session_state[key]).strip()
+    ]
+
+    if missing:
         st.session_state.log_message = (
             "error",
-            f"❌ Failed to write to Google Sheets: {e}",
+            f"Please fill in required fields: {', '.join(missing)}",
         )
+        return None
 
-    st.rerun()
\ No newline at end of file
+    row = {"Timestamp": time.strftime(TIMESTAMP_FORMAT)}
+    template = row_template()
+    for group in active_groups:
+        for key, column in template[group["name"]]:
+            row[column] = st.session_state[key]
+    return row
+
+
+def _advance_counters(active_groups: list) -> None:
+    """Step every active auto-increment counter on by one and stage it for the next rerun."""
+    for group in active_groups:
+        for var in group["variables"]:
+            if var.get("type") == "auto_increment":
+                key = f"{group['name']}_{var['name']}"
+                counter_key = f"_counter_{key}"
+                current_n = st.session_state.get(counter_key, int(var.get("start", 1)))
+                next_n = current_n + 1
+                formatted = format_counter(next_n, var)
+                st.session_state[key] = formatted
+                st.session_state[counter_key] = next_n
+                st.session_state[f"_pending_input_{key}"] = formatted
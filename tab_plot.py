@@ -2,13 +2,16 @@
 tab_plot.py — Renders the Plot Results tab (tab 2).
 """
 
+import numpy as np
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 
 from config import get_filterable_col_names
 from sheets import SheetLogger
+from utility import TIMESTAMP_FORMAT
+
+MAX_HOVER_RUNS = 20  # run IDs listed per bubble before the rest are summarised
 
 
 def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
@@ -18,6 +21,7 @@ def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
     with col_refresh:
         if st.button("🔄 Load / Refresh Data", type="primary", width="stretch"):
             with st.spinner("Pulling from Google Sheets..."):
+                logger.clear_cache()
                 st.session_state.df_cache = logger.load()
             st.session_state.pop("_plot_defaults_applied", None)
 
@@ -25,7 +29,7 @@ def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
         st.info("Press **Load / Refresh Data** to fetch runs from the sheet.")
         return
 
-    df = st.session_state.df_cache.copy()
+    df = st.session_state.df_cache
 
     if df.empty:
         st.info("No data logged yet — come back once you have some runs.")
@@ -34,8 +38,7 @@ def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
     with col_info:
         st.caption(f"Loaded **{len(df)}** runs. Press refresh to pull latest data from the sheet.")
 
-    numeric_cols = df.select_dtypes(include="number").columns.tolist()
-    categorical_cols = df.select_dtypes(exclude="number").columns.tolist()
+    numeric_cols, categorical_cols, n_unique = _column_stats(df)
     all_cols = df.columns.tolist()
 
     if len(numeric_cols) < 2:
@@ -47,9 +50,9 @@ def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
     filterable_col_names = get_filterable_col_names(groups)
 
     if filterable_col_names:
-        filterable = [c for c in filterable_col_names if c in df.columns and 1 < df[c].nunique() <= 30]
+        filterable = [c for c in filterable_col_names if 1 < n_unique.get(c, 0) <= 30]
     else:
-        filterable = [c for c in categorical_cols if 1 < df[c].nunique() <= 30]
+        filterable = [c for c in categorical_cols if 1 < n_unique[c] <= 30]
 
     df_filtered = _render_filter_panel(df, filterable, config)
 
@@ -107,9 +110,17 @@ def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
 
     # ── Aggregate ─────────────────────────────────────────────────────────────
 
+    if df_filtered.empty:
+        st.info("No runs match the current filters.")
+        return
+
     grouped = _aggregate(df_filtered, x_col, y_col, colour_col, numeric_cols, all_cols,
                          int(x_decimals), int(y_decimals), size_scale)
 
+    if grouped.empty:
+        st.info(f"None of the filtered runs have values for both **{x_col}** and **{y_col}**.")
+        return
+
     # ── Render chart ──────────────────────────────────────────────────────────
 
     fig = _build_figure(grouped, x_col, y_col, colour_col, numeric_cols, all_cols, size_scale)
@@ -130,11 +141,53 @@ def render_plot_tab(logger: SheetLogger, groups: list, config: dict) -> None:
 
     with st.expander("📐 Summary statistics", expanded=False):
         stat_cols = [c for c in [x_col, y_col] if c in plottable_cols]
-        st.dataframe(df_filtered[stat_cols].describe().round(4), width="stretch")
+        st.dataframe(_describe(df_filtered[stat_cols]), width="stretch")
 
 
 # ── Private helpers ───────────────────────────────────────────────────────────
 
+@st.cache_data(show_spinner=False)
+def _column_stats(df: pd.DataFrame) -> tuple[list[str], list[str], dict[str, int]]:
+    """
+    Return (numeric columns, non-numeric columns, distinct values per column).
+    Cached on the frame's contents, so widget reruns skip the nunique() scans.
+    """
+    numeric_cols = df.select_dtypes(include="number").columns.tolist()
+    categorical_cols = df.select_dtypes(exclude="number").columns.tolist()
+    return numeric_cols, categorical_cols, df.nunique().to_dict()
+
+
+@st.cache_data(show_spinner=False)
+def _filter_options(df: pd.DataFrame) -> dict[str, list]:
+    """
+    Return each column's distinct non-null values, sorted as strings.
+    Pass only the filter columns, as the cache key hashes the whole frame.
+    """
+    return {col: sorted(df[col].dropna().unique().tolist(), key=str) for col in df.columns}
+
+
+@st.cache_data(show_spinner=False)
+def _describe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summary statistics for the frame, rounded for display.
+    Pass only the columns wanted, as the cache key hashes the whole frame.
+    """
+    return df.describe().round(4)
+
+
+@st.cache_data(show_spinner=False)
+def _parse_timestamps(values: pd.Series) -> pd.Series:
+    """
+    Parse the Timestamp column, using the format the Log tab writes and only
+    falling back to format inference for cells in some other shape.
+    """
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, errors="coerce", cache=True)
+    missed = parsed.isna() & values.notna()
+    if missed.any():
+        parsed[missed] = pd.to_datetime(values[missed], errors="coerce", cache=True)
+    return parsed
+
+
 def _render_filter_panel(df: pd.DataFrame, filterable: list, config: dict) -> pd.DataFrame:
     """Render the filter expander and return the filtered DataFrame."""
     with st.expander("🔍 Filter Data", expanded=False):
@@ -142,13 +195,15 @@ def _render_filter_panel(df: pd.DataFrame, filterable: list, config: dict) -> pd
         if st.button("Reset filters"):
             st.session_state["_reset_filters"] = True
             st.rerun()
-        df_filtered = df.copy()
+        # Accumulate one row mask and index the frame once at the end
+        mask = np.ones(len(df), dtype=bool)
         filter_cols = st.columns(3)
         default_filters = config.get("default_filters", {})
+        options = _filter_options(df[filterable])
 
         for i, col in enumerate(filterable):
             with filter_cols[i % 3]:
-                unique_vals = sorted(df[col].dropna().unique().tolist(), key=str)
+                unique_vals = options[col]
                 filter_default = (
                     [v for v in default_filters.get(col, unique_vals) if v in unique_vals]
                     if col in default_filters else unique_vals
@@ -164,13 +219,11 @@ def _render_filter_panel(df: pd.DataFrame, filterable: list, config: dict) -> pd
                     default=filter_default,
                     key=key
                 )
-                if selected:
-                    df_filtered = df_filtered[
-                        df_filtered[col].isin(selected) | df_filtered[col].isna()
-                        ]
+                if selected and len(selected) < len(unique_vals):
+                    mask &= (df[col].isin(selected) | df[col].isna()).to_numpy()
         if "Timestamp" in df.columns:
-            df_filtered["Timestamp"] = pd.to_datetime(df_filtered["Timestamp"], errors="coerce")
-            valid_dates = df_filtered["Timestamp"].dropna()
+            timestamps = _parse_timestamps(df["Timestamp"])
+            valid_dates = timestamps[mask].dropna()
             if not valid_dates.empty:
                 min_date, max_date = valid_dates.min().date(), valid_dates.max().date()
                 if min_date < max_date:
@@ -183,11 +236,10 @@ def _render_filter_panel(df: pd.DataFrame, filterable: list, config: dict) -> pd
                             key="filter_date",
                         )
                         if len(date_range) == 2:
-                            df_filtered = df_filtered[
-                                (df_filtered["Timestamp"].dt.date >= date_range[0]) &
-                                (df_filtered["Timestamp"].dt.date <= date_range[1])
-                            ]
+                            dates = timestamps.dt.date
+                            mask &= ((dates >= date_range[0]) & (dates <= date_range[1])).to_numpy()
 
+        df_filtered = df[mask]
         st.caption(f"Showing **{len(df_filtered)}** of {len(df)} runs after filtering.")
 
     st.session_state.pop("_reset_filters", None)
@@ -229,32 +281,13 @@ def _aggregate(
     x_decimals: int, y_decimals: int, size_scale: int,
 ) -> pd.DataFrame:
     """Bin and group the filtered data for bubble plotting."""
-    plot_df = df.copy()
-    plot_df["_x_bin"] = plot_df[x_col].round(x_decimals)
-    plot_df["_y_bin"] = plot_df[y_col].round(y_decimals)
-
-    agg_dict: dict = {"_count": (x_col, "count")}
-
-    if colour_col != "(none)" and colour_col in plot_df.columns:
-        if colour_col in numeric_cols:
-            agg_dict["_colour"] = (colour_col, "mean")
-        else:
-            agg_dict["_colour"] = (colour_col, lambda x: x.mode().iloc[0] if len(x) > 0 else "")
-
+    if colour_col not in df.columns:
+        colour_col = "(none)"
     id_col = next((c for c in all_cols if "run" in c.lower() and "id" in c.lower()), None)
-    if id_col:
-        agg_dict["_runs"] = (
-            id_col,
-            lambda x: ", ".join(str(v) for v in x.dropna())
-        )
-
-    grouped = (
-        plot_df
-        .groupby(["_x_bin", "_y_bin"])
-        .agg(**agg_dict)
-        .reset_index()
-        .rename(columns={"_x_bin": x_col, "_y_bin": y_col})
-    )
+    # Pass only the columns used, as the cache key hashes the whole frame
+    used = [x_col, y_col] + [c for c in (colour_col, id_col) if c and c != "(none)"]
+    grouped = _group_bins(df[list(dict.fromkeys(used))], x_col, y_col, colour_col,
+                          colour_col in numeric_cols, id_col, x_decimals, y_decimals)
 
     counts = grouped["_count"].fillna(0)
     if counts.max() > counts.min():
@@ -265,6 +298,57 @@ def _aggregate(
     return grouped
 
 
+@st.cache_data(show_spinner=False)
+def _group_bins(
+    df: pd.DataFrame, x_col: str, y_col: str, colour_col: str, colour_numeric: bool,
+    id_col: str | None, x_decimals: int, y_decimals: int,
+) -> pd.DataFrame:
+    """
+    Group rows into (X, Y) bins with per-bin count, colour and run IDs.
+    Cached on the inputs, so bubble-size changes skip the groupby.
+    """
+    # Bin on integer keys (value * 10**decimals) so groupby hashes ints, not floats
+    x_scale, y_scale = 10 ** x_decimals, 10 ** y_decimals
+    x = df[x_col].to_numpy(dtype=float)
+    y = df[y_col].to_numpy(dtype=float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    # Group on standalone key arrays rather than adding bin columns to a copy
+    plot_df = df if valid.all() else df[valid]
+    x_bin = pd.Index(np.rint(x[valid] * x_scale).astype(np.int64), name="_x_bin")
+    y_bin = pd.Index(np.rint(y[valid] * y_scale).astype(np.int64), name="_y_bin")
+    keys = [x_bin, y_bin]
+
+    # Built-in aggregations only; no per-group Python callbacks
+    grouped = plot_df.groupby(keys).size().rename("_count").to_frame()
+
+    if colour_col != "(none)":
+        if colour_numeric:
+            grouped["_colour"] = plot_df.groupby(keys)[colour_col].mean()
+        else:
+            # Most common value per bin (ties go to the smallest, as Series.mode does)
+            counts = plot_df.groupby(keys + [plot_df[colour_col]]).size()
+            top = counts.groupby(level=[0, 1]).idxmax()
+            grouped["_colour"] = pd.Series([t[2] for t in top], index=top.index)
+            grouped["_colour"] = grouped["_colour"].fillna("")
+
+    if id_col:
+        has_id = plot_df[id_col].notna().to_numpy()
+        ids = plot_df[id_col][has_id].astype(str)
+        id_keys = [x_bin[has_id], y_bin[has_id]]
+        by_bin = ids.groupby(id_keys)
+        # Only the first MAX_HOVER_RUNS IDs per bubble are joined into its hover text
+        first = by_bin.cumcount().to_numpy() < MAX_HOVER_RUNS
+        runs = ids[first].groupby([k[first] for k in id_keys]).agg(", ".join)
+        extra = by_bin.size() - MAX_HOVER_RUNS
+        grouped["_runs"] = runs.where(extra <= 0, runs + ", … +" + extra.astype(str) + " more")
+        grouped["_runs"] = grouped["_runs"].fillna("")
+
+    grouped = grouped.reset_index()
+    grouped["_x_bin"] = grouped["_x_bin"] / x_scale
+    grouped["_y_bin"] = grouped["_y_bin"] / y_scale
+    return grouped.rename(columns={"_x_bin": x_col, "_y_bin": y_col})
+
+
 def _build_figure(
     grouped: pd.DataFrame, x_col: str, y_col: str, colour_col: str,
     numeric_cols: list, all_cols: list, size_scale: int,
@@ -288,37 +372,37 @@ def _build_figure(
 
     if colour_arg:
         if colour_col in numeric_cols:
-            fig = px.scatter(
-                grouped, x=x_col, y=y_col,
-                size="_size", color="_colour",
-                color_continuous_scale="Viridis",
-                size_max=size_scale,
-                template="plotly_white",
-                labels={"_colour": colour_col, "_size": "Count"},
-                custom_data=custom_cols,
-            )
-            fig.update_traces(hovertemplate=hover_template)
-            fig.update_coloraxes(colorbar_title=colour_col)
+            fig.add_trace(go.Scattergl(
+                x=grouped[x_col].to_numpy(), y=grouped[y_col].to_numpy(),
+                mode="markers",
+                marker=dict(size=grouped["_size"].to_numpy(), sizemode="diameter",
+                            color=grouped["_colour"].to_numpy(), colorscale="Viridis",
+                            showscale=True, colorbar=dict(title=colour_col),
+                            opacity=0.75, line=dict(width=1, color="white")),
+                customdata=grouped[custom_cols].to_numpy(),
+                hovertemplate=hover_template,
+            ))
+            fig.update_layout(template="plotly_white")
         else:
             for cat_val, grp in grouped.groupby("_colour"):
-                fig.add_trace(go.Scatter(
-                    x=grp[x_col], y=grp[y_col],
+                fig.add_trace(go.Scattergl(
+                    x=grp[x_col].to_numpy(), y=grp[y_col].to_numpy(),
                     mode="markers",
                     name=str(cat_val),
-                    marker=dict(size=grp["_size"], sizemode="diameter",
+                    marker=dict(size=grp["_size"].to_numpy(), sizemode="diameter",
                                 opacity=0.75, line=dict(width=1, color="white")),
-                    customdata=grp[custom_cols].values,
+                    customdata=grp[custom_cols].to_numpy(),
                     hovertemplate=hover_template,
                 ))
             fig.update_layout(template="plotly_white")
     else:
-        fig.add_trace(go.Scatter(
-            x=grouped[x_col], y=grouped[y_col],
+        fig.add_trace(go.Scattergl(
+            x=grouped[x_col].to_numpy(), y=grouped[y_col].to_numpy(),
             mode="markers",
-            marker=dict(size=grouped["_size"], sizemode="diameter",
+            marker=dict(size=grouped["_size"].to_numpy(), sizemode="diameter",
                         color="#1f77b4", opacity=0.75,
                         line=dict(width=1, color="white")),
-            customdata=grouped[custom_cols].values,
+            customdata=grouped[custom_cols].to_numpy(),
             hovertemplate=hover_template,
         ))
         fig.update_layout(template="plotly_white")
@@ -1,9 +1,13 @@
 """
-utility.py — Pure helper functions for auto-increment counter formatting.
+utility.py — Pure helper functions for auto-increment counter formatting,
+and the timestamp format shared by the tabs.
 """
 
 import re
 
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # format of the Timestamp column written with each run
+_NON_DIGITS = re.compile(r"[^0-9]")
+
 
 def format_counter(n: int, var: dict) -> str:
     """
@@ -30,6 +34,6 @@ def extract_counter(value: str, var: dict) -> int | None:
     prefix = var.get("prefix", "")
     try:
         stripped = value.replace(prefix, "") if (fmt == "prefixed" and prefix) else value
-        return int(re.sub(r"[^0-9]", "", stripped))
+        return int(_NON_DIGITS.sub("", stripped))
     except (ValueError, TypeError):
         return None
\ No newline at end of file